@@ -1,26 +1,59 @@
-from fastapi import FastAPI, UploadFile, File
-import tempfile
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response, UploadFile, File
+from fastapi.responses import ORJSONResponse
+import orjson
+import aiofiles.tempfile
 import sys,os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from app_logging import configure_logging
 from workflow import PhysioSOAPAgent
+from helper.extract import load_encoding
+from helper.transcribe import downmix_audio
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging()
+    # Build the agent once so its clients and settings are reused across requests
+    app.state.agent = PhysioSOAPAgent()
+    # Load the tokenizer off the event loop before the first request needs it
+    await load_encoding()
+    yield
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# Stream uploads to disk in fixed-size chunks so peak memory stays constant
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
 
 @app.post("/process-audio/")
-async def process_audio(file: UploadFile = File(...)):
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as temp_audio:
-        temp_audio.write(await file.read())
+async def process_audio(request: Request, file: UploadFile = File(...)):
+    async with aiofiles.tempfile.NamedTemporaryFile(
+        "wb", delete=False, suffix=".mp3", buffering=UPLOAD_CHUNK_SIZE
+    ) as temp_audio:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await temp_audio.write(chunk)
         temp_audio_path = temp_audio.name
 
-    agent = PhysioSOAPAgent()
+    # Shrink the upload to Whisper; drop the raw file once re-encoded
+    downmixed_path = await downmix_audio(temp_audio_path)
+    if downmixed_path != temp_audio_path:
+        os.remove(temp_audio_path)
+        temp_audio_path = downmixed_path
+
+    agent = request.app.state.agent
     result = await agent.process_audio_to_soap(audio_path=temp_audio_path)
 
-    return {
+    soap_model = result["soap_model"]
+
+    # Embed Pydantic's own JSON for the SOAP model instead of dumping and re-encoding it
+    body = orjson.dumps({
         "status": "success",
-        "patient_name": result["soap_model"].patient_name,
-        "session_date": result["soap_model"].session_date,
-        "soap": result["soap_model"].model_dump(), #.dict(),  # You may need to implement `dict()` in SoapModel
+        "patient_name": soap_model.patient_name,
+        "session_date": soap_model.session_date,
+        "soap": orjson.Fragment(soap_model.model_dump_json()),
         "markdown_path": result["markdown_path"]
-    }
+    })
+    return Response(content=body, media_type="application/json")
@@ -1,50 +1,172 @@
 """Structured logging configuration with HIPAA compliance for PhysioSOAP MVP."""
 
+import logging
 import re
 import sys
 import structlog
+from pydantic import ValidationError
 from typing import Any, Dict, Optional
 from config import settings
 
+try:
+    import hyperscan
+except ImportError:  # Optional: fall back to the combined `re` pattern below
+    hyperscan = None
+
 
 # PHI patterns for redaction (when HIPAA_MODE is enabled)
 PHI_PATTERNS = [
     (re.compile(r'\b\d{3}-\d{2}-\d{4}\b'), '[SSN_REDACTED]'),  # SSN
     (re.compile(r'\b\d{10,}\b'), '[PHONE_REDACTED]'),  # Phone numbers
     (re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'), '[EMAIL_REDACTED]'),  # Email
-    (re.compile(r'\b[A-Z][a-z]+ [A-Z][a-z]+\b'), '[NAME_REDACTED]'),  # Names (basic pattern)
 ]
 
+# Log fields that always carry PHI; redacted by name instead of pattern-scanning.
+# File paths are included because report and upload names embed the patient name.
+PHI_FIELDS = frozenset({
+    "patient_name",
+    "patient_id",
+    "therapist_name",
+    "session_date",
+    "follow_up_date",
+    "audio_path",
+    "output_path",
+    "markdown_path",
+    "subjective",
+    "objective",
+    "assessment",
+    "plan",
+    "chief_complaint",
+    "treatment_goals",
+})
+
+# All PHI patterns combined into one alternation so each message is scanned once
+_PHI_RE = re.compile("|".join(
+    f"(?P<g{i}>{pattern.pattern})" for i, (pattern, _) in enumerate(PHI_PATTERNS)
+))
+_PHI_REPLACEMENTS = {f"g{i}": replacement for i, (_, replacement) in enumerate(PHI_PATTERNS)}
+_PHI_REPLACEMENT_BYTES = [replacement.encode() for _, replacement in PHI_PATTERNS]
+
+# Every PHI pattern needs a digit or "@"; messages without one skip the scan
+_PHI_TRIGGER_RE = re.compile(r'[0-9@]')
+
+
+def _compile_phi_database() -> Optional[Any]:
+    """Compile PHI patterns into a Hyperscan database for single-pass DFA matching."""
+    if hyperscan is None:
+        return None
+    
+    try:
+        database = hyperscan.Database()
+        database.compile(
+            expressions=[pattern.pattern.encode() for pattern, _ in PHI_PATTERNS],
+            ids=list(range(len(PHI_PATTERNS))),
+            elements=len(PHI_PATTERNS),
+            flags=[hyperscan.HS_FLAG_SOM_LEFTMOST] * len(PHI_PATTERNS),
+        )
+    except hyperscan.error:
+        return None
+    
+    return database
+
+
+_PHI_DATABASE = _compile_phi_database()
+
+# Cached copy of settings.hipaa_mode, refreshed by configure_logging()
+_hipaa_mode = settings.hipaa_mode
+
 
 def redact_phi(message: str) -> str:
     """Redact PHI from log messages when HIPAA mode is enabled."""
-    if not settings.hipaa_mode:
+    if not _hipaa_mode or not _PHI_TRIGGER_RE.search(message):
         return message
     
-    redacted = message
-    for pattern, replacement in PHI_PATTERNS:
-        redacted = pattern.sub(replacement, redacted)
+    if _PHI_DATABASE is not None:
+        return _redact_phi_hyperscan(message)
     
-    return redacted
+    return _PHI_RE.sub(lambda match: _PHI_REPLACEMENTS[match.lastgroup], message)
+
+
+def _redact_phi_hyperscan(message: str) -> str:
+    """Redact PHI using one Hyperscan pass over the encoded message."""
+    data = message.encode()
+    matches = []
+    
+    def on_match(pattern_id, start, end, flags, context):
+        matches.append((start, pattern_id, -end))
+    
+    _PHI_DATABASE.scan(data, match_event_handler=on_match)
+    if not matches:
+        return message
+    
+    # Hyperscan reports every match end; keep the leftmost, first-pattern,
+    # longest non-overlapping spans to mirror `re` alternation semantics
+    parts = []
+    position = 0
+    for start, pattern_id, negative_end in sorted(matches):
+        if start < position:
+            continue
+        parts.append(data[position:start])
+        parts.append(_PHI_REPLACEMENT_BYTES[pattern_id])
+        position = -negative_end
+    parts.append(data[position:])
+    
+    return b"".join(parts).decode()
+
+
+def error_message(error: BaseException) -> str:
+    """
+    Describe an exception for logging without echoing PHI-bearing input.
+    
+    Pydantic's ValidationError text embeds the offending input (e.g. the GPT
+    payload with patient details), so only field locations and messages are kept.
+    """
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(map(str, err['loc'])) or 'model'}: {err['msg']}"
+            for err in error.errors(include_url=False, include_context=False, include_input=False)
+        )
+    return str(error)
 
 
 def phi_processor(logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
-    """Process log events to redact PHI when HIPAA mode is enabled."""
-    if settings.hipaa_mode:
-        # Redact the main event message
-        if 'event' in event_dict:
-            event_dict['event'] = redact_phi(str(event_dict['event']))
-        
-        # Redact any string values in the event dict
-        for key, value in event_dict.items():
-            if isinstance(value, str):
-                event_dict[key] = redact_phi(value)
+    """
+    Process log events to redact PHI.
+    
+    Only installed by configure_logging() when HIPAA mode is enabled.
+    """
+    # Redact the main event message
+    if 'event' in event_dict:
+        event_dict['event'] = redact_phi(str(event_dict['event']))
+    
+    # Redact known PHI fields outright and pattern-scan other string values
+    for key, value in event_dict.items():
+        if key in PHI_FIELDS:
+            event_dict[key] = '[REDACTED]'
+        elif isinstance(value, str):
+            event_dict[key] = redact_phi(value)
     
     return event_dict
 
 
-def configure_logging() -> None:
-    """Configure structured logging for the application."""
+def configure_logging(log_format: Optional[str] = None) -> None:
+    """
+    Configure structured logging for the application.
+    
+    Args:
+        log_format: "json" or "console"; defaults to settings.log_format
+    """
+    global _hipaa_mode
+    _hipaa_mode = settings.hipaa_mode
+    
+    # Route structlog's stdlib loggers to stdout at the configured level
+    logging.basicConfig(format="%(message)s", stream=sys.stdout, level=settings.log_level.upper())
+    
+    # The root level would also enable the HTTP clients' per-request INFO lines,
+    # which interleave with the CLI output; only let their warnings through
+    for name in ("httpx", "httpcore", "openai"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    
     processors = [
         structlog.stdlib.filter_by_level,
         structlog.stdlib.add_logger_name,
@@ -52,10 +174,12 @@ def configure_logging() -> None:
         structlog.stdlib.PositionalArgumentsFormatter(),
         structlog.processors.TimeStamper(fmt="iso"),
         structlog.processors.StackInfoRenderer(),
-        phi_processor,  # Custom PHI redaction processor
     ]
     
-    if settings.log_format == "json":
+    if _hipaa_mode:
+        processors.append(phi_processor)  # Custom PHI redaction processor
+    
+    if (log_format or settings.log_format) == "json":
         processors.append(structlog.processors.JSONRenderer())
     else:
         processors.append(structlog.dev.ConsoleRenderer())
@@ -69,9 +193,10 @@ def configure_logging() -> None:
 
 
 def get_logger(name: str) -> structlog.BoundLogger:
-    """Get a configured logger instance."""
+    """
+    Get a logger instance.
+    
+    Loggers are lazy proxies, so module-level loggers pick up the configuration
+    applied later by configure_logging() from the application entry point.
+    """
     return structlog.get_logger(name)
-
-
-# Configure logging on import
-configure_logging() 
\ No newline at end of file
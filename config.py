@@ -1,6 +1,7 @@
 """Configuration management for PhysioSOAP MVP."""
 
 import os
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 from pydantic_settings import BaseSettings
@@ -15,6 +16,7 @@ class Settings(BaseSettings):
     openai_model_gpt: str = Field(default="gpt-4o-mini", env="OPENAI_MODEL_GPT")
     openai_model_whisper: str = Field(default="whisper-1", env="OPENAI_MODEL_WHISPER")
     max_tokens: int = Field(default=2048, env="MAX_TOKENS")
+    max_concurrent_whisper: int = Field(default=8, env="MAX_CONCURRENT_WHISPER")
     
     # Directory Configuration
     pdf_output_dir: Path = Field(default=Path("./output"), env="PDF_OUTPUT_DIR")
@@ -34,13 +36,16 @@ class Settings(BaseSettings):
     
     class Config:
         env_file = ".env"
-        
 
-    def __post_init__(self):
-        """Create necessary directories if they don't exist."""
-        self.pdf_output_dir.mkdir(parents=True, exist_ok=True)
-        self.audio_input_dir.mkdir(parents=True, exist_ok=True)
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load settings once per process and create the working directories."""
+    settings = Settings()
+    settings.pdf_output_dir.mkdir(parents=True, exist_ok=True)
+    settings.audio_input_dir.mkdir(parents=True, exist_ok=True)
+    return settings
 
 
 # Global settings instance
-settings = Settings() 
\ No newline at end of file
+settings = get_settings() 
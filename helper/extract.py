@@ -1,21 +1,43 @@
 """Helper functions for extracting SOAP components from transcribed text using OpenAI GPT."""
 
 import asyncio
+import functools
+import hashlib
 import json
-from typing import List
-import openai
-from tenacity import retry, stop_after_attempt, wait_exponential
+import time
+from typing import List, Optional, Tuple
+from cachetools import TTLCache
+import orjson
+import tiktoken
 from pydantic import ValidationError
 from datetime import date
 
 from config import settings
 from models.soap import SoapModel
-from app_logging import get_logger
+from app_logging import error_message, get_logger
+from openai_clients import TRANSIENT_ERRORS, openai_client, retrying
 
 logger = get_logger(__name__)
 
-# Initialize OpenAI client
-openai_client = openai.AsyncOpenAI(api_key=settings.openai_api_key)
+# Cache of extracted SOAP models keyed by normalized transcript hash
+_soap_cache: TTLCache = TTLCache(maxsize=1024, ttl=3600)
+
+# Tokens shared between consecutive transcript chunks
+CHUNK_OVERLAP_TOKENS = 50
+
+# Tokenizer, set once it loads; failed loads are retried after a back-off
+ENCODING_RETRY_SECONDS = 60.0
+_encoding: Optional[tiktoken.Encoding] = None
+_encoding_retry_at = 0.0
+
+# Bound concurrent per-chunk extraction calls for long transcripts
+MAX_CONCURRENT_PARTIAL_EXTRACTIONS = 8
+
+# asyncio primitives bind to the event loop that first uses them, so the cache
+# lock and extraction semaphore are recreated whenever the running loop changes
+_primitives_loop: Optional[asyncio.AbstractEventLoop] = None
+_soap_cache_lock: Optional[asyncio.Lock] = None
+_partial_extraction_semaphore: Optional[asyncio.Semaphore] = None
 
 # Comprehensive SOAP extraction prompt
 SOAP_EXTRACTION_PROMPT = """You are an expert physiotherapist and clinical documentation specialist. Your task is to extract structured SOAP (Subjective, Objective, Assessment, Plan) information from a transcribed therapy session.
@@ -106,6 +128,102 @@ Optional fields you may include if information is available:
 
 Now extract SOAP information from this transcribed session:"""
 
+# Appended to the system prompt when a previous attempt failed validation
+SOAP_GUIDANCE_PROMPT = """
+        The previous extraction failed validation with these errors:
+        {errors}
+        
+        Please ensure:
+        1. All required fields (patient_name, session_date, subjective, objective, assessment, plan) are included
+        2. Each text field has at least 10 characters
+        3. Dates are in YYYY-MM-DD format
+        4. session_duration (if included) is between 15 and 180 minutes
+        
+        Re-extract the SOAP information with these corrections:
+        """
+
+# Lighter prompt used to extract partial SOAP notes from one transcript chunk
+PARTIAL_EXTRACTION_PROMPT = """You are an expert physiotherapist and clinical documentation specialist. The text below is one segment of a longer transcribed therapy session. Extract the SOAP (Subjective, Objective, Assessment, Plan) information that this segment contains.
+
+You must return ONLY a valid JSON object with these keys, using an empty string when the segment has nothing relevant:
+- patient_name
+- therapist_name
+- subjective
+- objective
+- assessment
+- plan
+
+Now extract SOAP information from this transcript segment:"""
+
+# User message prefix for the final merge of partial SOAP notes
+MERGE_PARTIALS_PREFIX = """The session transcript was too long to process at once, so it was split into consecutive segments. Below are the partial SOAP notes extracted from each segment, in order. Merge them into a single complete SOAP record without dropping any clinical information.
+
+"""
+
+# Errors worth another extraction attempt: bad model output or transient API failures
+RETRYABLE_EXTRACTION_ERRORS = (ValidationError, json.JSONDecodeError) + TRANSIENT_ERRORS
+
+
+def _get_encoding() -> Optional[tiktoken.Encoding]:
+    """
+    Load the tokenizer for the configured GPT model.
+    
+    tiktoken downloads its BPE files on first use, so this blocks and needs
+    network access; returns None when the encoding cannot be loaded.
+    """
+    try:
+        try:
+            return tiktoken.encoding_for_model(settings.openai_model_gpt)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning("Tokenizer unavailable, estimating tokens from length", error=str(e))
+        return None
+
+
+async def load_encoding() -> Optional[tiktoken.Encoding]:
+    """
+    Load the tokenizer off the event loop; cheap once it has been loaded.
+    
+    Only a successful load is kept. After a failure (often a transient network
+    error fetching the BPE file) callers get None until the back-off expires
+    and the next call tries again.
+    """
+    global _encoding, _encoding_retry_at
+    if _encoding is not None:
+        return _encoding
+    if time.monotonic() < _encoding_retry_at:
+        return None
+    
+    encoding = await asyncio.to_thread(_get_encoding)
+    if encoding is None:
+        _encoding_retry_at = time.monotonic() + ENCODING_RETRY_SECONDS
+    else:
+        _encoding = encoding
+    return encoding
+
+
+@functools.lru_cache(maxsize=2)
+def _todays_prompt(today: date) -> str:
+    """Format the SOAP extraction prompt once per day."""
+    return SOAP_EXTRACTION_PROMPT.format(today_date=today.isoformat())
+
+
+def _loop_primitives() -> Tuple[asyncio.Lock, asyncio.Semaphore]:
+    """Return the cache lock and extraction semaphore for the running event loop."""
+    global _primitives_loop, _soap_cache_lock, _partial_extraction_semaphore
+    loop = asyncio.get_running_loop()
+    if _primitives_loop is not loop:
+        _primitives_loop = loop
+        _soap_cache_lock = asyncio.Lock()
+        _partial_extraction_semaphore = asyncio.Semaphore(MAX_CONCURRENT_PARTIAL_EXTRACTIONS)
+    return _soap_cache_lock, _partial_extraction_semaphore
+
+
+def _transcript_cache_key(text: str) -> str:
+    """Build the SOAP cache key for a transcript."""
+    return hashlib.blake2b(text.strip().lower().encode(), digest_size=16).hexdigest()
+
 
 async def chunk_text_if_needed(text: str, max_tokens: int = None) -> List[str]:
     """
@@ -121,7 +239,32 @@ async def chunk_text_if_needed(text: str, max_tokens: int = None) -> List[str]:
     if max_tokens is None:
         max_tokens = settings.max_tokens - 500  # Buffer for prompt and response
     
-    # Rough estimation: 1 token ≈ 4 characters
+    encoding = await load_encoding()
+    if encoding is None:
+        # Rough estimation: 1 token ≈ 4 characters
+        return _chunk_by_estimate(text, max_tokens)
+    
+    tokens = encoding.encode(text)
+    
+    if len(tokens) <= max_tokens:
+        return [text]
+    
+    logger.warning("Text exceeds token limit, chunking required",
+                  token_count=len(tokens),
+                  max_tokens=max_tokens)
+    
+    # Slide a fixed token window with a small overlap so context carries across chunks
+    overlap = min(CHUNK_OVERLAP_TOKENS, max_tokens // 4)
+    step = max_tokens - overlap
+    
+    return [
+        encoding.decode(tokens[i:i + max_tokens])
+        for i in range(0, len(tokens) - overlap, step)
+    ]
+
+
+def _chunk_by_estimate(text: str, max_tokens: int) -> List[str]:
+    """Chunk text by character count when no tokenizer is available."""
     estimated_tokens = len(text) // 4
     
     if estimated_tokens <= max_tokens:
@@ -131,51 +274,74 @@ async def chunk_text_if_needed(text: str, max_tokens: int = None) -> List[str]:
                   estimated_tokens=estimated_tokens,
                   max_tokens=max_tokens)
     
-    # Split by sentences, then recombine to fit token limits
-    sentences = text.split('. ')
-    chunks = []
-    current_chunk = ""
+    # Same overlapping window as the tokenized path, measured in characters
+    window = max_tokens * 4
+    overlap = min(CHUNK_OVERLAP_TOKENS, max_tokens // 4) * 4
+    step = window - overlap
     
-    for sentence in sentences:
-        # Check if adding this sentence would exceed the limit
-        if len(current_chunk + sentence) // 4 > max_tokens:
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-                current_chunk = sentence + '. '
-            else:
-                # Single sentence is too long, truncate it
-                chunks.append(sentence[:max_tokens * 4])
-        else:
-            current_chunk += sentence + '. '
-    
-    if current_chunk:
-        chunks.append(current_chunk.strip())
+    return [text[i:i + window] for i in range(0, len(text) - overlap, step)]
+
+
+async def _complete_json(system_prompt: str, user_content: str) -> dict:
+    """Run one JSON-mode chat completion and parse the response."""
+    response = await openai_client.chat.completions.create(
+        model=settings.openai_model_gpt,
+        messages=[
+            {
+                "role": "system",
+                "content": system_prompt
+            },
+            {
+                "role": "user", 
+                "content": user_content
+            }
+        ],
+        max_tokens=settings.max_tokens,
+        temperature=0.1,  # Low temperature for consistent extraction
+        response_format={"type": "json_object"}
+    )
     
-    return chunks
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers are unchanged
+    return orjson.loads(response.choices[0].message.content)
+
+
+async def _extract_partial(chunk: str) -> dict:
+    """Extract partial SOAP notes from a single transcript chunk."""
+    _, semaphore = _loop_primitives()
+    async with semaphore:
+        return await _complete_json(PARTIAL_EXTRACTION_PROMPT, chunk)
 
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=4, max=10)
-)
-async def extract_soap_from_text(text: str) -> SoapModel:
+async def extract_soap_from_text(text: str, guidance: str = "") -> SoapModel:
     """
     Extract SOAP information from transcribed text using OpenAI GPT.
     
     Args:
         text: Transcribed therapy session text
+        guidance: Optional correction guidance appended to the system prompt
         
     Returns:
         Validated SoapModel instance
         
     Raises:
-        Exception: If extraction fails after retries
+        json.JSONDecodeError: If GPT returns invalid JSON
+        ValidationError: If the response does not match SoapModel
     """
     logger.info("Starting SOAP extraction", text_length=len(text))
     
+    cache_key = _transcript_cache_key(text)
+    cache_lock, _ = _loop_primitives()
+    async with cache_lock:
+        cached_model = _soap_cache.get(cache_key)
+    if cached_model is not None:
+        logger.info("SOAP extraction cache hit", text_length=len(text))
+        # Callers may mutate their model; never hand out the cached instance itself
+        return cached_model.model_copy(deep=True)
+    
     # Add today's date to the prompt
-    today_date = date.today().isoformat()
-    full_prompt = SOAP_EXTRACTION_PROMPT.format(today_date=today_date)
+    full_prompt = _todays_prompt(date.today())
+    if guidance:
+        full_prompt += guidance
     
     try:
         # Check if text needs chunking
@@ -183,35 +349,19 @@ async def extract_soap_from_text(text: str) -> SoapModel:
         
         if len(chunks) > 1:
             logger.info("Processing multiple text chunks", chunk_count=len(chunks))
-            # For multiple chunks, we'll process them separately and combine
-            # This is a simplified approach - in production, you might want more sophisticated merging
-            combined_text = " ".join(chunks[:2])  # Use first 2 chunks for now
+            # Map: extract partial notes per chunk in parallel; reduce: merge them in one call
+            partials = await asyncio.gather(*(_extract_partial(chunk) for chunk in chunks))
+            merge_content = MERGE_PARTIALS_PREFIX + orjson.dumps(partials, option=orjson.OPT_INDENT_2).decode()
+            soap_data = await _complete_json(full_prompt, merge_content)
         else:
-            combined_text = chunks[0]
-        
-        response = await openai_client.chat.completions.create(
-            model=settings.openai_model_gpt,
-            messages=[
-                {
-                    "role": "system",
-                    "content": full_prompt
-                },
-                {
-                    "role": "user", 
-                    "content": combined_text
-                }
-            ],
-            max_tokens=settings.max_tokens,
-            temperature=0.1,  # Low temperature for consistent extraction
-            response_format={"type": "json_object"}
-        )
-        
-        # Parse the JSON response
-        soap_data = json.loads(response.choices[0].message.content)
+            soap_data = await _complete_json(full_prompt, chunks[0])
         
         # Validate using Pydantic model
         soap_model = SoapModel.model_validate(soap_data)
         
+        async with cache_lock:
+            _soap_cache[cache_key] = soap_model.model_copy(deep=True)
+        
         logger.info("SOAP extraction completed successfully",
                    text_length=len(text),
                    patient_name=soap_model.patient_name)
@@ -220,12 +370,11 @@ async def extract_soap_from_text(text: str) -> SoapModel:
         
     except json.JSONDecodeError as e:
         logger.error("Failed to parse JSON response", error=str(e))
-        raise ValueError(f"Invalid JSON response from GPT: {str(e)}")
+        raise
         
     except ValidationError as e:
-        logger.error("SOAP validation failed", error=str(e))
-        # Try to re-prompt with validation guidance
-        raise ValueError(f"SOAP validation failed: {str(e)}")
+        logger.error("SOAP validation failed", error=error_message(e))
+        raise
         
     except Exception as e:
         logger.error("SOAP extraction failed", error=str(e))
@@ -236,6 +385,9 @@ async def extract_soap(text: str) -> SoapModel:
     """
     Extract SOAP with automatic retry and validation guidance.
     
+    Failed validations feed their errors back into the prompt of the next
+    attempt, so guidance costs no extra GPT call beyond the retry itself.
+    
     Args:
         text: Transcribed therapy session text
         
@@ -245,46 +397,22 @@ async def extract_soap(text: str) -> SoapModel:
     if not text or len(text.strip()) < 50:
         raise ValueError("Text is too short for meaningful SOAP extraction")
     
+    guidance = ""
+    
+    def add_guidance(error: BaseException, attempt: int) -> None:
+        nonlocal guidance
+        if isinstance(error, (ValidationError, json.JSONDecodeError)):
+            logger.warning("Extraction failed validation, retrying with guidance",
+                          attempt=attempt)
+            guidance = SOAP_GUIDANCE_PROMPT.format(errors=str(error))
+    
     try:
-        return await extract_soap_from_text(text)
-    except ValidationError as e:
-        logger.warning("First extraction failed validation, retrying with guidance")
-        
-        # Create a guidance prompt based on the validation error
-        guidance_prompt = f"""
-        The previous extraction failed validation with these errors:
-        {str(e)}
-        
-        Please ensure:
-        1. All required fields (patient_name, session_date, subjective, objective, assessment, plan) are included
-        2. Each text field has at least 10 characters
-        3. Dates are in YYYY-MM-DD format
-        4. session_duration (if included) is between 15 and 180 minutes
-        
-        Re-extract the SOAP information with these corrections:
-        """
-        
-        try:
-            response = await openai_client.chat.completions.create(
-                model=settings.openai_model_gpt,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": SOAP_EXTRACTION_PROMPT + guidance_prompt
-                    },
-                    {
-                        "role": "user",
-                        "content": text
-                    }
-                ],
-                max_tokens=settings.max_tokens,
-                temperature=0.1,
-                response_format={"type": "json_object"}
-            )
-            
-            soap_data = json.loads(response.choices[0].message.content)
-            return SoapModel.model_validate(soap_data)
-            
-        except Exception as retry_error:
-            logger.error("Retry extraction also failed", error=str(retry_error))
-            raise ValueError(f"SOAP extraction failed after retry: {str(retry_error)}")
+        return await retrying(
+            lambda: extract_soap_from_text(text, guidance),
+            retry_on=RETRYABLE_EXTRACTION_ERRORS,
+            on_retry=add_guidance
+        )
+    except (ValidationError, json.JSONDecodeError) as e:
+        err_str = error_message(e)
+        logger.error("SOAP extraction failed after retries", error=err_str)
+        raise ValueError(f"SOAP extraction failed after retry: {err_str}")
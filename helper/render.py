@@ -1,8 +1,10 @@
 """Helper functions for rendering SOAP models into Markdown reports."""
 
 import asyncio
+import re
 from pathlib import Path
 from datetime import datetime
+import aiofiles
 
 from config import settings
 from models.soap import SoapModel
@@ -10,8 +12,11 @@ from app_logging import get_logger
 
 logger = get_logger(__name__)
 
+# Runs of characters that are unsafe in output filenames
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^\w-]+")
 
-def render_soap_to_markdown(soap_model: SoapModel, output_path: str) -> str:
+
+async def render_soap_to_markdown(soap_model: SoapModel, output_path: str) -> str:
     """
     Render SOAP model to Markdown format.
     
@@ -22,7 +27,7 @@ def render_soap_to_markdown(soap_model: SoapModel, output_path: str) -> str:
     Returns:
         Path to the generated Markdown file
     """
-    markdown_content = f"""# SOAP Report
+    parts: list[str] = [f"""# SOAP Report
 ## Physiotherapy Session Documentation
 
 ---
@@ -30,18 +35,18 @@ def render_soap_to_markdown(soap_model: SoapModel, output_path: str) -> str:
 ### Patient Information
 - **Patient Name:** {soap_model.patient_name}
 - **Session Date:** {soap_model.session_date}
-"""
+"""]
 
     if soap_model.therapist_name:
-        markdown_content += f"- **Therapist:** {soap_model.therapist_name}\n"
+        parts.append(f"- **Therapist:** {soap_model.therapist_name}\n")
     
     if soap_model.session_duration:
-        markdown_content += f"- **Session Duration:** {soap_model.session_duration} minutes\n"
+        parts.append(f"- **Session Duration:** {soap_model.session_duration} minutes\n")
     
     if soap_model.chief_complaint:
-        markdown_content += f"- **Chief Complaint:** {soap_model.chief_complaint}\n"
+        parts.append(f"- **Chief Complaint:** {soap_model.chief_complaint}\n")
 
-    markdown_content += f"""
+    parts.append(f"""
 ---
 
 ## SUBJECTIVE
@@ -67,33 +72,35 @@ def render_soap_to_markdown(soap_model: SoapModel, output_path: str) -> str:
 {soap_model.plan}
 
 ---
-"""
+""")
 
     if soap_model.treatment_goals:
-        markdown_content += f"""
+        parts.append(f"""
 ### Treatment Goals
 
 {soap_model.treatment_goals}
 
 ---
-"""
+""")
 
     if soap_model.follow_up_date:
-        markdown_content += f"""
+        parts.append(f"""
 ### Follow-up Information
 
 - **Next Appointment:** {soap_model.follow_up_date}
 
 ---
-"""
+""")
 
-    markdown_content += f"""
+    parts.append(f"""
 *Report generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*
-"""
+""")
+
+    markdown_content = "".join(parts)
 
     # Write to file
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(markdown_content)
+    async with aiofiles.open(output_path, 'w', encoding='utf-8') as f:
+        await f.write(markdown_content)
     
     return output_path
 
@@ -118,8 +125,7 @@ async def render_soap_to_pdf(soap_model: SoapModel, output_filename: str = None)
         # Generate filename if not provided
         if not output_filename:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            safe_patient_name = "".join(c for c in soap_model.patient_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
-            safe_patient_name = safe_patient_name.replace(' ', '_')
+            safe_patient_name = _UNSAFE_FILENAME_CHARS.sub("_", soap_model.patient_name).strip("_")
             output_filename = f"SOAP_{safe_patient_name}_{timestamp}.md"
         
         if not output_filename.endswith('.md'):
@@ -131,7 +137,7 @@ async def render_soap_to_pdf(soap_model: SoapModel, output_filename: str = None)
         
         # Generate Markdown
         logger.info("Generating Markdown report", output_path=str(output_path))
-        render_soap_to_markdown(soap_model, str(output_path))
+        await render_soap_to_markdown(soap_model, str(output_path))
         
         logger.info("Markdown report generated successfully", 
                    output_path=str(output_path),
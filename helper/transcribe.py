@@ -1,27 +1,35 @@
 """Helper functions for audio transcription using OpenAI Whisper API."""
 
 import asyncio
+import shutil
+import tempfile
 from pathlib import Path
-from typing import List
-import openai
-from tenacity import retry, stop_after_attempt, wait_exponential
+from typing import List, Optional, Set, Tuple
 
 from config import settings
 from app_logging import get_logger
+from openai_clients import openai_client, retrying
 
 logger = get_logger(__name__)
 
 # Maximum file size for Whisper API (25MB)
 MAX_FILE_SIZE = 25 * 1024 * 1024
 
-# Initialize OpenAI client
-openai_client = openai.AsyncOpenAI(api_key=settings.openai_api_key)
+# Chunk export settings: mono 64 kbps MP3, kept well under the Whisper limit
+CHUNK_TARGET_SIZE = 20 * 1024 * 1024
+CHUNK_BITRATE_KBPS = 64
+
+# Granularity of the silence scan used to pick chunk boundaries
+SILENCE_SEEK_STEP_MS = 50
+
+# Speech-optimised encoding applied before upload (16 kHz mono 32 kbps MP3)
+DOWNMIX_FFMPEG_ARGS = ["-ac", "1", "-ar", "16000", "-b:a", "32k", "-codec:a", "libmp3lame"]
+
+# Micro-batching of Whisper requests arriving from concurrent workflows
+WHISPER_BATCH_SIZE = 16
+WHISPER_BATCH_WINDOW_SECONDS = 0.05
 
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=4, max=10)
-)
 async def transcribe_audio_chunk(audio_path: Path) -> str:
     """
     Transcribe a single audio file using OpenAI Whisper API.
@@ -37,14 +45,19 @@ async def transcribe_audio_chunk(audio_path: Path) -> str:
     """
     logger.info("Starting transcription", audio_path=str(audio_path))
     
-    try:
-        # Open and read the file
+    async def request_transcription() -> str:
+        # Reopen the file per attempt so retries upload from the start. The SDK
+        # hands open file objects straight to httpx, which streams the multipart
+        # body in small chunks; passing a path or bytes would load the whole file.
         with open(audio_path, 'rb') as audio_file:
-            response = await openai_client.audio.transcriptions.create(
+            return await openai_client.audio.transcriptions.create(
                 model=settings.openai_model_whisper,
-                file=audio_file,
+                file=(Path(audio_path).name, audio_file),
                 response_format="text"
             )
+    
+    try:
+        response = await retrying(request_transcription)
         
         logger.info("Transcription completed successfully", 
                    audio_path=str(audio_path),
@@ -59,12 +72,150 @@ async def transcribe_audio_chunk(audio_path: Path) -> str:
         raise
 
 
+class _WhisperDispatcher:
+    """
+    Coalesce Whisper requests from concurrent workflows into bounded batches.
+    
+    Requests are queued and drained by a single worker task, which groups
+    whatever arrives within a short window and dispatches each group in
+    parallel under a shared semaphore, so the rate limit applies to the
+    whole process rather than per workflow.
+    """
+    
+    def __init__(self, max_batch_size: int, batch_window: float, max_concurrency: int):
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self.max_concurrency = max_concurrency
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._batches: Set[asyncio.Task] = set()
+    
+    async def submit(self, audio_path: Path) -> str:
+        """Queue an audio file for transcription and wait for its transcript."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            # (Re)start the worker on the current event loop; asyncio primitives
+            # bind to the loop that first uses them, so they are recreated too
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._worker = loop.create_task(self._run())
+        
+        future = loop.create_future()
+        await self._queue.put((audio_path, future))
+        return await future
+    
+    async def _run(self) -> None:
+        """Drain the queue into batches and dispatch them without blocking intake."""
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.batch_window
+            
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            task = self._loop.create_task(self._dispatch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+    
+    async def _dispatch(self, batch: List[Tuple[Path, asyncio.Future]]) -> None:
+        """Transcribe one batch in parallel, resolving each caller's future as its request finishes."""
+        logger.info("Dispatching Whisper batch", batch_size=len(batch))
+        
+        await asyncio.gather(
+            *(self._transcribe(audio_path, future) for audio_path, future in batch)
+        )
+    
+    async def _transcribe(self, audio_path: Path, future: asyncio.Future) -> None:
+        # Bound concurrent Whisper requests to respect OpenAI rate limits
+        async with self._semaphore:
+            try:
+                result = await transcribe_audio_chunk(audio_path)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                if not future.done():  # Caller may have been cancelled
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+
+_whisper_dispatcher = _WhisperDispatcher(
+    WHISPER_BATCH_SIZE, WHISPER_BATCH_WINDOW_SECONDS, settings.max_concurrent_whisper
+)
+
+
+def _split_audio_on_silence(audio_path: Path) -> List[Path]:
+    """
+    Split an audio file into MP3 chunks, cutting at silences where possible.
+    
+    Args:
+        audio_path: Path to the original audio file
+        
+    Returns:
+        List of paths to the exported chunks, in playback order
+    """
+    # pydub is only needed for oversized files; importing it probes for ffmpeg
+    from pydub import AudioSegment
+    from pydub.silence import detect_silence
+    
+    audio = AudioSegment.from_file(audio_path)
+    
+    # Longest chunk whose exported MP3 stays under the target size
+    max_chunk_ms = int(CHUNK_TARGET_SIZE * 8 / (CHUNK_BITRATE_KBPS * 1000) * 1000)
+    
+    # Candidate cut points are the midpoints of detected silences. Detection runs
+    # on a mono 8 kHz copy in 50 ms steps; positions are in ms either way
+    probe = audio.set_channels(1).set_frame_rate(8000)
+    silences = detect_silence(
+        probe,
+        min_silence_len=500,
+        silence_thresh=probe.dBFS - 16,
+        seek_step=SILENCE_SEEK_STEP_MS
+    )
+    cut_points = [(start + end) // 2 for start, end in silences]
+    
+    boundaries = []
+    chunk_start = 0
+    while len(audio) - chunk_start > max_chunk_ms:
+        window_end = chunk_start + max_chunk_ms
+        candidates = [cut for cut in cut_points if chunk_start < cut <= window_end]
+        chunk_end = candidates[-1] if candidates else window_end
+        boundaries.append((chunk_start, chunk_end))
+        chunk_start = chunk_end
+    boundaries.append((chunk_start, len(audio)))
+    
+    output_dir = Path(tempfile.mkdtemp(prefix="physiosoap_chunks_"))
+    chunk_paths = []
+    for i, (start, end) in enumerate(boundaries):
+        chunk_path = output_dir / f"part{i}.mp3"
+        audio[start:end].export(
+            chunk_path,
+            format="mp3",
+            bitrate=f"{CHUNK_BITRATE_KBPS}k",
+            parameters=["-ac", "1"]
+        )
+        chunk_paths.append(chunk_path)
+    
+    return chunk_paths
+
+
 async def chunk_large_audio(audio_path: Path) -> List[Path]:
     """
     Split large audio files into smaller chunks if they exceed the size limit.
     
-    Note: This is a placeholder implementation. In production, you would use
-    a library like pydub to split audio files based on time or silence detection.
+    Chunks are cut at silences where possible to avoid splitting mid-word and
+    are written to a temporary directory.
     
     Args:
         audio_path: Path to the original audio file
@@ -82,9 +233,56 @@ async def chunk_large_audio(audio_path: Path) -> List[Path]:
                   file_size=file_size,
                   max_size=MAX_FILE_SIZE)
     
-    # TODO: Implement actual audio chunking using pydub or similar
-    # For now, we'll just return the original file and handle the error
-    return [audio_path]
+    # pydub decoding and export are blocking; keep them off the event loop
+    chunks = await asyncio.to_thread(_split_audio_on_silence, audio_path)
+    
+    logger.info("Audio chunking completed",
+               audio_path=str(audio_path),
+               chunk_count=len(chunks))
+    
+    return chunks
+
+
+async def downmix_audio(audio_path: str) -> str:
+    """
+    Re-encode audio as 16 kHz mono 32 kbps MP3 to shrink the Whisper upload.
+    
+    Args:
+        audio_path: Path to the original audio file
+        
+    Returns:
+        Path to the re-encoded file, or the original path if ffmpeg fails
+    """
+    output_path = str(Path(audio_path).with_suffix("")) + "_downmix.mp3"
+    
+    try:
+        process = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-y", "-loglevel", "error", "-i", audio_path,
+            *DOWNMIX_FFMPEG_ARGS, output_path,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+    except OSError as e:
+        # ffmpeg is not installed or not executable
+        logger.warning("Audio downmix unavailable, using original file",
+                      audio_path=audio_path,
+                      error=str(e))
+        return audio_path
+    
+    _, stderr = await process.communicate()
+    
+    if process.returncode != 0:
+        logger.warning("Audio downmix failed, using original file",
+                      audio_path=audio_path,
+                      error=stderr.decode(errors="replace").strip())
+        return audio_path
+    
+    logger.info("Audio downmixed for transcription",
+               audio_path=audio_path,
+               original_size=Path(audio_path).stat().st_size,
+               downmixed_size=Path(output_path).stat().st_size)
+    
+    return output_path
 
 
 async def transcribe_audio(audio_path: str) -> str:
@@ -103,22 +301,23 @@ async def transcribe_audio(audio_path: str) -> str:
     """
     path = Path(audio_path)
     
-    if not path.exists():
-        raise FileNotFoundError(f"Audio file not found: {audio_path}")
-    
     # Check file extension
     supported_formats = {'.mp3', '.mp4', '.mpeg', '.mpga', '.m4a', '.wav', '.webm'}
     if path.suffix.lower() not in supported_formats:
         raise ValueError(f"Unsupported audio format: {path.suffix}")
     
-    # Check and chunk if necessary
+    # Check and chunk if necessary; stat() raises FileNotFoundError for missing files
     chunks = await chunk_large_audio(path)
     
-    # Transcribe all chunks
-    transcripts = []
-    for chunk_path in chunks:
-        transcript = await transcribe_audio_chunk(chunk_path)
-        transcripts.append(transcript)
+    # Transcribe all chunks through the shared dispatcher; gather preserves chunk order
+    try:
+        transcripts = await asyncio.gather(
+            *(_whisper_dispatcher.submit(chunk_path) for chunk_path in chunks)
+        )
+    finally:
+        # Remove temporary chunk files, never the original upload
+        if chunks != [path]:
+            shutil.rmtree(chunks[0].parent, ignore_errors=True)
     
     # Combine all transcripts
     full_transcript = " ".join(transcripts)
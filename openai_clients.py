@@ -0,0 +1,69 @@
+"""Shared OpenAI client for PhysioSOAP MVP helpers."""
+
+import asyncio
+import random
+from typing import Awaitable, Callable, Optional, Tuple, Type, TypeVar
+
+import httpx
+import openai
+
+from config import settings
+
+T = TypeVar("T")
+
+# Transient failures worth retrying; client errors such as BadRequestError are not
+TRANSIENT_ERRORS: Tuple[Type[BaseException], ...] = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+    httpx.TransportError,
+)
+
+
+# One pooled HTTP/2 transport shared by every OpenAI call in the process
+http_client = httpx.AsyncClient(
+    limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+    http2=True,
+    timeout=httpx.Timeout(60.0, connect=5.0),
+)
+
+# Shared OpenAI client used by transcription and extraction. The SDK's own
+# retries are disabled so retrying() below is the single retry policy.
+openai_client = openai.AsyncOpenAI(
+    api_key=settings.openai_api_key,
+    http_client=http_client,
+    max_retries=0,
+)
+
+
+async def retrying(
+    request_factory: Callable[[], Awaitable[T]],
+    retry_on: Tuple[Type[BaseException], ...] = TRANSIENT_ERRORS,
+    attempts: int = 3,
+    base: float = 4.0,
+    cap: float = 10.0,
+    on_retry: Optional[Callable[[BaseException, int], None]] = None,
+) -> T:
+    """
+    Await a fresh request from request_factory, retrying on transient errors.
+    
+    Args:
+        request_factory: Zero-argument callable returning a new awaitable per attempt
+        retry_on: Exception types that trigger another attempt
+        attempts: Maximum number of attempts
+        base: Base delay in seconds for exponential backoff
+        cap: Maximum backoff delay in seconds (before jitter)
+        on_retry: Optional callback receiving the error and failed attempt number
+        
+    Returns:
+        Result of the first successful attempt
+    """
+    for attempt in range(attempts):
+        try:
+            return await request_factory()
+        except retry_on as e:
+            if attempt == attempts - 1:
+                raise
+            if on_retry is not None:
+                on_retry(e, attempt + 1)
+            await asyncio.sleep(min(cap, base * 2 ** attempt) + random.random())
@@ -9,24 +9,50 @@ with proper error handling, logging, and resilience.
 """
 
 import asyncio
+import os
 import sys
+import time
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Union
 import argparse
+import importlib
 from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich.panel import Panel
 from rich.table import Table
+from rich.text import Text
 
-from helper import transcribe, extract, render
 from models.soap import SoapModel
 from config import settings
-from app_logging import get_logger
+from app_logging import configure_logging, error_message, get_logger
 
 logger = get_logger(__name__)
 console = Console()
 
+# Step header labels, in workflow order
+STEP_LABELS = ("Audio Transcription", "SOAP Information Extraction", "Markdown Report Generation")
+
+# Step headers and the CLI banner are built once rather than re-parsed per run
+STEP_HEADERS = tuple(
+    Text.from_markup(f"\n[bold cyan]Step {i}: {label}[/bold cyan]")
+    for i, label in enumerate(STEP_LABELS, start=1)
+)
+
+BANNER = Panel.fit(
+    "[bold blue]PhysioSOAP MVP - AI Agent[/bold blue]\n"
+    "Converting therapy session audio to structured SOAP reports",
+    style="blue"
+)
+
+
+# The helper modules (OpenAI SDK, tiktoken, ...) are imported on first use so
+# that --help and argument errors don't pay for loading them
+async def _import_extract_helpers():
+    """Import helper.extract and load its tokenizer without blocking the loop."""
+    extract = await asyncio.to_thread(importlib.import_module, "helper.extract")
+    await extract.load_encoding()
+    return extract
+
 
 class PhysioSOAPAgent:
     """
@@ -36,12 +62,15 @@ class PhysioSOAPAgent:
     coordinating between transcription, extraction, and rendering functions.
     """
     
+    # Workflow steps in execution order, as keyed in workflow_stats
+    _STEPS: tuple = ("transcription", "extraction", "rendering")
+    
     def __init__(self):
         self.workflow_stats: Dict[str, Any] = {}
     
     async def process_audio_to_soap(
         self, 
-        audio_path: str, 
+        audio_path: Union[str, "os.PathLike[str]"], 
         output_filename: str = None
     ) -> Dict[str, Any]:
         """
@@ -58,128 +87,166 @@ class PhysioSOAPAgent:
             ValueError: If audio file is invalid
             RuntimeError: If any step in the workflow fails
         """
-        start_time = datetime.now()
-        workflow_id = f"workflow_{start_time.strftime('%Y%m%d_%H%M%S')}"
+        # Normalise once; the helpers accept plain string paths
+        audio_path = os.fspath(audio_path)
+        audio_name = os.path.basename(audio_path)
+        workflow_start = time.perf_counter()
+        # Nanosecond hex IDs sort by start time and don't collide within a second
+        workflow_id = f"workflow_{time.time_ns():016x}"
+        start_time_iso = datetime.now().isoformat(timespec="seconds")
         
-        logger.info("Starting PhysioSOAP workflow", 
-                   workflow_id=workflow_id,
-                   audio_path=audio_path)
+        # Every workflow event carries the workflow ID via a bound logger
+        log = logger.bind(workflow_id=workflow_id)
+        log.info("Starting PhysioSOAP workflow", audio_path=audio_path)
         
-        # Initialize workflow stats
-        self.workflow_stats = {
+        # Initialize workflow stats; kept local so one agent can serve concurrent
+        # workflows, with self.workflow_stats pointing at the most recent run
+        # Every key is present up front; steps stay None until they complete
+        workflow_stats = {
             "workflow_id": workflow_id,
-            "start_time": start_time,
+            "start_time": start_time_iso,
             "audio_path": audio_path,
+            "status": "running",
             "steps_completed": [],
-            "errors": []
+            "errors": [],
+            "transcription": None,
+            "extraction": None,
+            "rendering": None,
+            "total_duration_seconds": None,
+            "end_time": None
         }
+        self.workflow_stats = workflow_stats
         
         try:
-            # Validate audio file
-            audio_file = Path(audio_path)
-            if not audio_file.exists():
-                raise ValueError(f"Audio file not found: {audio_path}")
-            
-            # Step 1: Transcription
-            console.print("\n[bold cyan]Step 1: Audio Transcription[/bold cyan]")
-            console.print(f"Processing: {audio_file.name}")
-            
-            transcription_start = datetime.now()
-            transcribed_text = await transcribe.transcribe_audio(audio_path)
-            transcription_time = (datetime.now() - transcription_start).total_seconds()
-            
-            self.workflow_stats["transcription"] = {
-                "duration_seconds": transcription_time,
-                "text_length": len(transcribed_text),
-                "completed_at": datetime.now()
-            }
-            self.workflow_stats["steps_completed"].append("transcription")
-            
-            console.print(f"[green]✓ Transcription completed ({transcription_time:.1f}s)[/green]")
-            console.print(f"Transcribed text length: {len(transcribed_text)} characters")
-            
-            # Step 2: SOAP Extraction
-            console.print("\n[bold cyan]Step 2: SOAP Information Extraction[/bold cyan]")
-            
-            extraction_start = datetime.now()
-            soap_model = await extract.extract_soap(transcribed_text)
-            extraction_time = (datetime.now() - extraction_start).total_seconds()
+            from helper.transcribe import transcribe_audio
             
-            self.workflow_stats["extraction"] = {
-                "duration_seconds": extraction_time,
-                "patient_name": soap_model.patient_name,
-                "session_date": str(soap_model.session_date),
-                "completed_at": datetime.now()
-            }
-            self.workflow_stats["steps_completed"].append("extraction")
-            
-            console.print(f"[green]✓ SOAP extraction completed ({extraction_time:.1f}s)[/green]")
-            console.print(f"Patient: {soap_model.patient_name}")
-            console.print(f"Session Date: {soap_model.session_date}")
-            
-            # Step 3: Markdown Rendering
-            console.print("\n[bold cyan]Step 3: Markdown Report Generation[/bold cyan]")
-            
-            rendering_start = datetime.now()
-            markdown_path = await render.render_soap_to_pdf(soap_model, output_filename)
-            rendering_time = (datetime.now() - rendering_start).total_seconds()
-            
-            self.workflow_stats["rendering"] = {
-                "duration_seconds": rendering_time,
-                "markdown_path": markdown_path,
-                "completed_at": datetime.now()
-            }
-            self.workflow_stats["steps_completed"].append("rendering")
-            
-            console.print(f"[green]✓ Markdown generation completed ({rendering_time:.1f}s)[/green]")
-            console.print(f"Markdown saved: {markdown_path}")
+            # The steps run in the TaskGroup body; if one fails, the group cancels
+            # the helper imports still running in the background instead of
+            # leaving them to finish unobserved
+            async with asyncio.TaskGroup() as tg:
+                # Import the extraction and rendering helpers (and the tokenizer) in
+                # background threads so their cost hides behind the transcription round-trip
+                extract_import = tg.create_task(_import_extract_helpers())
+                render_import = tg.create_task(
+                    asyncio.to_thread(importlib.import_module, "helper.render")
+                )
+                
+                # Step 1: Transcription
+                console.print(STEP_HEADERS[0])
+                console.print(f"Processing: {audio_name}")
+                
+                # A missing audio file surfaces as FileNotFoundError naming audio_path
+                transcription_start = time.perf_counter()
+                transcribed_text = await transcribe_audio(audio_path)
+                transcription_time = time.perf_counter() - transcription_start
+                
+                workflow_stats["transcription"] = {
+                    "duration_seconds": transcription_time,
+                    "text_length": len(transcribed_text),
+                    "completed_at": time.time()
+                }
+                
+                log.info("Transcription step completed",
+                         duration=round(transcription_time, 1),
+                         text_length=len(transcribed_text))
+                
+                # Step 2: SOAP Extraction
+                console.print(STEP_HEADERS[1])
+                
+                extract_soap = (await extract_import).extract_soap
+                
+                extraction_start = time.perf_counter()
+                soap_model = await extract_soap(transcribed_text)
+                extraction_time = time.perf_counter() - extraction_start
+                
+                workflow_stats["extraction"] = {
+                    "duration_seconds": extraction_time,
+                    "patient_name": soap_model.patient_name,
+                    "session_date": str(soap_model.session_date),
+                    "completed_at": time.time()
+                }
+                
+                log.info("SOAP extraction step completed",
+                         duration=round(extraction_time, 1),
+                         patient_name=soap_model.patient_name,
+                         session_date=str(soap_model.session_date))
+                
+                # Step 3: Markdown Rendering
+                console.print(STEP_HEADERS[2])
+                
+                render_soap_to_pdf = (await render_import).render_soap_to_pdf
+                
+                rendering_start = time.perf_counter()
+                markdown_path = await render_soap_to_pdf(soap_model, output_filename)
+                rendering_time = time.perf_counter() - rendering_start
+                
+                workflow_stats["rendering"] = {
+                    "duration_seconds": rendering_time,
+                    "markdown_path": markdown_path,
+                    "completed_at": time.time()
+                }
+                
+                log.info("Markdown rendering step completed",
+                         duration=round(rendering_time, 1),
+                         markdown_path=markdown_path)
             
             # Workflow completed successfully
-            total_time = (datetime.now() - start_time).total_seconds()
-            self.workflow_stats["total_duration_seconds"] = total_time
-            self.workflow_stats["status"] = "completed"
-            self.workflow_stats["end_time"] = datetime.now()
+            total_time = time.perf_counter() - workflow_start
+            workflow_stats["total_duration_seconds"] = total_time
+            workflow_stats["steps_completed"] = self._completed_steps(workflow_stats)
+            workflow_stats["status"] = "completed"
+            workflow_stats["end_time"] = datetime.now().isoformat(timespec="seconds")
             
-            logger.info("PhysioSOAP workflow completed successfully",
-                       workflow_id=workflow_id,
-                       total_duration=total_time,
-                       patient_name=soap_model.patient_name)
+            log.info("PhysioSOAP workflow completed successfully",
+                     total_duration=total_time,
+                     patient_name=soap_model.patient_name)
             
             # Display summary
-            self._display_workflow_summary()
+            self._display_workflow_summary(workflow_stats)
             
             return {
                 "status": "success",
-                "workflow_stats": self.workflow_stats,
+                "workflow_stats": workflow_stats,
                 "soap_model": soap_model,
                 "markdown_path": markdown_path,
                 "transcribed_text": transcribed_text
             }
             
         except Exception as e:
-            error_time = datetime.now()
+            # TaskGroup wraps failures in an ExceptionGroup; report the step's own error
+            if isinstance(e, ExceptionGroup):
+                e = e.exceptions[0]
+            err_str = error_message(e)
             error_info = {
-                "error": str(e),
-                "error_type": type(e).__name__,
-                "occurred_at": error_time
+                "error": err_str,
+                "error_type": e.__class__.__name__,
+                "occurred_at": time.time()
             }
             
-            self.workflow_stats["errors"].append(error_info)
-            self.workflow_stats["status"] = "failed"
-            self.workflow_stats["end_time"] = error_time
+            workflow_stats["errors"].append(error_info)
+            workflow_stats["steps_completed"] = self._completed_steps(workflow_stats)
+            workflow_stats["status"] = "failed"
+            workflow_stats["end_time"] = datetime.now().isoformat(timespec="seconds")
             
-            logger.error("PhysioSOAP workflow failed",
-                        workflow_id=workflow_id,
-                        error=str(e),
-                        steps_completed=self.workflow_stats["steps_completed"])
+            log.error("PhysioSOAP workflow failed",
+                      error=err_str,
+                      steps_completed=workflow_stats["steps_completed"])
             
-            console.print(f"\n[bold red]✗ Workflow failed: {str(e)}[/bold red]")
+            console.print(f"\n[bold red]✗ Workflow failed: {err_str}[/bold red]")
             
-            raise RuntimeError(f"PhysioSOAP workflow failed: {str(e)}")
+            # Only the audio file itself going missing is an input error; other
+            # missing files (ffmpeg, the output directory, ...) are workflow failures
+            if isinstance(e, FileNotFoundError) and e.filename is not None \
+                    and Path(e.filename) == Path(audio_path):
+                raise ValueError(f"Audio file not found: {audio_path}") from e
+            raise RuntimeError(f"PhysioSOAP workflow failed: {err_str}")
+    
+    def _completed_steps(self, workflow_stats: Dict[str, Any]) -> list:
+        """List the steps that have recorded stats, in execution order."""
+        return [step for step in self._STEPS if workflow_stats[step] is not None]
     
-    def _display_workflow_summary(self) -> None:
+    def _display_workflow_summary(self, workflow_stats: Dict[str, Any]) -> None:
         """Display a summary of the completed workflow."""
-        
         console.print("\n" + "="*60)
         console.print(Panel.fit(
             "[bold green]PhysioSOAP Workflow Completed Successfully![/bold green]",
@@ -192,23 +259,26 @@ class PhysioSOAPAgent:
         table.add_column("Duration", style="green")
         table.add_column("Status", style="bold green")
         
-        for step in ["transcription", "extraction", "rendering"]:
-            if step in self.workflow_stats:
-                duration = f"{self.workflow_stats[step]['duration_seconds']:.1f}s"
-                table.add_row(step.title(), duration, "✓ Completed")
+        rows = [
+            (step.title(), f"{workflow_stats[step]['duration_seconds']:.1f}s", "✓ Completed")
+            for step in self._STEPS
+            if workflow_stats[step] is not None
+        ]
+        for row in rows:
+            table.add_row(*row)
         
         console.print(table)
         
         # Display key information
-        console.print(f"\n[bold]Workflow ID:[/bold] {self.workflow_stats['workflow_id']}")
-        console.print(f"[bold]Total Duration:[/bold] {self.workflow_stats['total_duration_seconds']:.1f} seconds")
+        console.print(f"\n[bold]Workflow ID:[/bold] {workflow_stats['workflow_id']}")
+        console.print(f"[bold]Total Duration:[/bold] {workflow_stats['total_duration_seconds']:.1f} seconds")
         
-        if "extraction" in self.workflow_stats:
-            console.print(f"[bold]Patient:[/bold] {self.workflow_stats['extraction']['patient_name']}")
-            console.print(f"[bold]Session Date:[/bold] {self.workflow_stats['extraction']['session_date']}")
+        if workflow_stats["extraction"] is not None:
+            console.print(f"[bold]Patient:[/bold] {workflow_stats['extraction']['patient_name']}")
+            console.print(f"[bold]Session Date:[/bold] {workflow_stats['extraction']['session_date']}")
         
-        if "rendering" in self.workflow_stats:
-            console.print(f"[bold]Markdown Report:[/bold] {self.workflow_stats['rendering']['markdown_path']}")
+        if workflow_stats["rendering"] is not None:
+            console.print(f"[bold]Markdown Report:[/bold] {workflow_stats['rendering']['markdown_path']}")
         
         console.print("="*60)
 
@@ -221,6 +291,7 @@ async def main():
     )
     parser.add_argument(
         "audio_path",
+        type=lambda value: Path(value).expanduser().resolve(strict=False),
         help="Path to the audio file to process"
     )
     parser.add_argument(
@@ -238,12 +309,11 @@ async def main():
     
     args = parser.parse_args()
     
+    # Render log events for a terminal rather than as JSON lines
+    configure_logging(log_format="console")
+    
     try:
-        console.print(Panel.fit(
-            "[bold blue]PhysioSOAP MVP - AI Agent[/bold blue]\n"
-            "Converting therapy session audio to structured SOAP reports",
-            style="blue"
-        ))
+        console.print(BANNER)
         
         agent = PhysioSOAPAgent()
         result = await agent.process_audio_to_soap(
@@ -259,8 +329,9 @@ async def main():
         return 1
         
     except Exception as e:
-        console.print(f"\n[bold red]Error:[/bold red] {str(e)}")
-        logger.error("Main workflow failed", error=str(e))
+        err_str = error_message(e)
+        console.print(f"\n[bold red]Error:[/bold red] {err_str}")
+        logger.error("Main workflow failed", error=err_str)
         return 1
 
 